@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import glob
+import importlib.util
+import io
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from merge_databases_robust import MERGE_ENGINES, merge_databases
+
+# Tables as `prisma migrate` creates them for prisma/schema.prisma
+SCHEMA_SQL = """
+CREATE TABLE "User" (
+    "id" TEXT NOT NULL PRIMARY KEY,
+    "email" TEXT NOT NULL,
+    "password" TEXT NOT NULL,
+    "name" TEXT,
+    "role" TEXT NOT NULL DEFAULT 'user',
+    "createdAt" DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" DATETIME NOT NULL
+);
+CREATE TABLE "Application" (
+    "id" TEXT NOT NULL PRIMARY KEY,
+    "updatedAt" DATETIME NOT NULL,
+    "countryOfResidence" TEXT NOT NULL,
+    "phone" TEXT NOT NULL,
+    "address" TEXT NOT NULL,
+    "workplace" TEXT NOT NULL,
+    "position" TEXT NOT NULL,
+    "educationLevel" TEXT NOT NULL,
+    "otherEducation" TEXT,
+    "professionalContext" TEXT NOT NULL,
+    "otherContext" TEXT,
+    "expectedContribution" TEXT NOT NULL,
+    "otherContribution" TEXT,
+    "projectType" TEXT NOT NULL,
+    "projectArea" TEXT NOT NULL,
+    "otherProjectArea" TEXT,
+    "projectSummary" TEXT NOT NULL,
+    "projectMotivation" TEXT NOT NULL,
+    "cvFileUrl" TEXT,
+    "idPassportFileUrl" TEXT,
+    "degreeFileUrl" TEXT,
+    "canFinanceExpenses" TEXT,
+    "status" TEXT NOT NULL DEFAULT 'pending',
+    "email" TEXT NOT NULL,
+    "firstName" TEXT NOT NULL,
+    "gender" TEXT NOT NULL,
+    "lastName" TEXT NOT NULL,
+    "middleName" TEXT,
+    "nationality" TEXT NOT NULL,
+    "title" TEXT NOT NULL,
+    "createdAt" DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "rejectionReason" TEXT,
+    "submittedAt" DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "estimatedBudget" TEXT,
+    "fundingSources" TEXT,
+    "fundingSecured" TEXT,
+    "fundingProofUrl" TEXT,
+    "fundingPlanUrl" TEXT,
+    "sustainabilityPlan" TEXT,
+    "fundingInfoRequested" BOOLEAN NOT NULL DEFAULT false,
+    "fundingInfoSubmitted" BOOLEAN NOT NULL DEFAULT false,
+    "fundingInfoSubmittedAt" DATETIME,
+    "starred" BOOLEAN NOT NULL DEFAULT false
+);
+CREATE TABLE "AdditionalDocuments" (
+    "id" TEXT NOT NULL PRIMARY KEY,
+    "applicationId" TEXT NOT NULL,
+    "submissionStatus" TEXT NOT NULL DEFAULT 'pending',
+    "createdAt" DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" DATETIME NOT NULL,
+    "achievements" TEXT,
+    "degreeCertifications" TEXT,
+    "fullProjectProposal" TEXT,
+    "fundingPlan" TEXT,
+    "identityDocument" TEXT,
+    "languageProficiency" TEXT,
+    "referenceOne" TEXT,
+    "referenceTwo" TEXT,
+    "riskMitigation" TEXT,
+    "submittedAt" DATETIME,
+    CONSTRAINT "AdditionalDocuments_applicationId_fkey" FOREIGN KEY ("applicationId") REFERENCES "Application" ("id") ON DELETE RESTRICT ON UPDATE CASCADE
+);
+CREATE UNIQUE INDEX "User_email_key" ON "User"("email");
+CREATE UNIQUE INDEX "Application_email_key" ON "Application"("email");
+CREATE INDEX "Application_status_idx" ON "Application"("status");
+CREATE INDEX "Application_createdAt_idx" ON "Application"("createdAt");
+CREATE INDEX "Application_starred_idx" ON "Application"("starred");
+CREATE INDEX "AdditionalDocuments_applicationId_idx" ON "AdditionalDocuments"("applicationId");
+"""
+
+STATUSES = ("pending", "approved", "rejected", "under_review")
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def load_importer():
+    """Load the newest migration-backup-*/import_data_enhanced.py, which is not in a package"""
+    paths = sorted(glob.glob(os.path.join(SCRIPT_DIR, "migration-backup-*", "import_data_enhanced.py")))
+    if not paths:
+        raise FileNotFoundError("no migration-backup-*/import_data_enhanced.py found")
+    spec = importlib.util.spec_from_file_location("import_data_enhanced", paths[-1])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def create_database(path):
+    """Create an empty database with the Prisma schema"""
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA_SQL)
+    conn.close()
+
+def populate(path, first, last, label):
+    """Fill a database with applications first..last-1 and a document for every third one"""
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "INSERT INTO User (id, email, password, name, role, createdAt, updatedAt) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ("admin", "admin@example.org", "x" * 60, "Admin", "admin", "2025-01-01 00:00:00", "2025-01-01 00:00:00"),
+    )
+    conn.executemany("""
+        INSERT INTO Application (
+            id, updatedAt, countryOfResidence, phone, address, workplace, position,
+            educationLevel, professionalContext, expectedContribution, projectType, projectArea,
+            projectSummary, projectMotivation, cvFileUrl, status, email, firstName, gender,
+            lastName, nationality, title, createdAt, submittedAt
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        (
+            f"app-{i:08d}", f"2025-{1 + i % 12:02d}-{1 + i % 28:02d} 10:00:00", "Rwanda",
+            f"+250{i:09d}", f"KG {i % 500} St", "Ministry of Health", "Researcher",
+            "Masters", "academia", "research", "research", "health",
+            f"Project summary {i} ({label}). " * 8, "Motivation text. " * 8,
+            f"/uploads/cv/cv-{i}.pdf", STATUSES[i % len(STATUSES)], f"applicant{i}@example.org",
+            "First", "female" if i % 2 else "male", f"Last{i}", "Rwandan", "Dr",
+            "2025-01-01 10:00:00", "2025-01-01 10:00:00",
+        )
+        for i in range(first, last)
+    ))
+    conn.executemany("""
+        INSERT INTO AdditionalDocuments (id, applicationId, submissionStatus, updatedAt, identityDocument)
+        VALUES (?, ?, ?, ?, ?)
+    """, (
+        (f"doc-{i:08d}", f"app-{i:08d}", "submitted", "2025-02-01 10:00:00", f"/uploads/id/id-{i}.pdf")
+        for i in range(first, last) if i % 3 == 0
+    ))
+    conn.commit()
+    conn.close()
+
+def make_snapshot_pair(workdir, applications, overlap):
+    """Build a dev.db/server_db_backup.db pair sharing `overlap` of the server applications"""
+    local_db = os.path.join(workdir, "base_dev.db")
+    server_db = os.path.join(workdir, "server_db_backup.db")
+    shared = int(applications * overlap)
+    for path in (local_db, server_db):
+        create_database(path)
+    populate(local_db, 0, applications, "local")
+    populate(server_db, applications - shared, 2 * applications - shared, "server")
+    return local_db, server_db
+
+def time_merge(base_db, server_db, engine, batch_size):
+    """Run merge_databases() on a fresh copy of base_db and return the wall time in seconds"""
+    local_db = base_db.replace("base_", f"{engine}_")
+    shutil.copyfile(base_db, local_db)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            merge_databases(local_db, server_db, batch_size=batch_size, engine=engine)
+            return time.perf_counter() - started
+    finally:
+        os.remove(local_db)
+
+def benchmark_merge(args):
+    print("🚀 Starting merge benchmark...")
+    print("=" * 40)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        base_db, server_db = make_snapshot_pair(workdir, args.applications, args.overlap)
+        conn = sqlite3.connect(server_db)
+        rows = sum(
+            conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("User", "Application", "AdditionalDocuments")
+        )
+        conn.close()
+        print(f"📊 Server snapshot: {rows} rows, overlap {args.overlap:.0%}")
+
+        for engine in args.engines:
+            best = min(time_merge(base_db, server_db, engine, args.batch_size) for _ in range(args.repeat))
+            print(f"   {engine:<8} {best:8.3f}s  {rows / best:12,.0f} rows/sec")
+
+def benchmark_timestamps(args):
+    """Time the importer's timestamp parsers on export-shaped strings"""
+    importer = load_importer()
+    print("🚀 Starting timestamp parser benchmark...")
+    print("=" * 40)
+
+    # Draw from a pool so a share of the values repeats, as updated_at/created_at do in real exports
+    rng = random.Random(42)
+    pool = [
+        f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} "
+        f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+        for _ in range(max(1, int(args.values * (1 - args.repeat_ratio))))
+    ]
+    values = [rng.choice(pool) for _ in range(args.values)]
+    print(f"📊 {len(values)} timestamps, {len(pool)} distinct")
+
+    expected = [importer.parse_datetime_strptime(value) for value in values]
+    parsers = [
+        ("strptime", importer.parse_datetime_strptime),
+        ("fast", importer.parse_datetime_uncached),
+    ]
+    if args.cache_size:
+        importer.use_datetime_cache(args.cache_size)
+        parsers.append((f"fast+lru{args.cache_size}", importer.parse_datetime))
+
+    for name, parse in parsers:
+        if [parse(value) for value in values] != expected:
+            raise AssertionError(f"{name} parser disagrees with strptime")
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            for value in values:
+                parse(value)
+            best = min(best, time.perf_counter() - started)
+        print(f"   {name:<14} {best:8.3f}s  {len(values) / best:12,.0f} values/sec")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the merge and import tooling on synthetic data")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    merge = subparsers.add_parser("merge", help="compare the merge engines")
+    merge.add_argument("--applications", type=int, default=10000, help="applications per snapshot")
+    merge.add_argument("--overlap", type=float, default=0.5, help="share of server applications already local")
+    merge.add_argument("--engines", nargs="+", choices=MERGE_ENGINES, default=list(MERGE_ENGINES))
+    merge.add_argument("--batch-size", type=int, default=1000)
+    merge.add_argument("--repeat", type=int, default=3, help="runs per engine; the best one is reported")
+    merge.set_defaults(run=benchmark_merge)
+
+    timestamps = subparsers.add_parser("timestamps", help="compare the importer's timestamp parsers")
+    timestamps.add_argument("--values", type=int, default=200000, help="timestamps to parse")
+    timestamps.add_argument("--repeat-ratio", type=float, default=0.5, help="share of values that are repeats")
+    timestamps.add_argument("--cache-size", type=int, default=4096, help="LRU size for the cached run (0 skips it)")
+    timestamps.add_argument("--repeat", type=int, default=3, help="runs per parser; the best one is reported")
+    timestamps.set_defaults(run=benchmark_timestamps)
+
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
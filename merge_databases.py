@@ -4,6 +4,9 @@ import sqlite3
 import os
 from datetime import datetime
 
+from merge_databases_robust import format_counts, merge_table_attached
+from sync_schema import SYNC_TABLES, shared_mapping
+
 def merge_databases():
     print("🚀 Starting database merge...")
     print("=" * 40)
@@ -38,54 +41,25 @@ def merge_databases():
         print(f"   Local - Users: {local_users_before}, Apps: {local_apps_before}, Docs: {local_docs_before}")
         print(f"   Server - Users: {server_users}, Apps: {server_apps}, Docs: {server_docs}")
         
-        # Merge Users table (INSERT OR REPLACE to avoid duplicates)
-        print("\n🔄 Merging Users table...")
-        server_cursor.execute("SELECT * FROM User")
-        users = server_cursor.fetchall()
+        # Copy rows inside SQLite; none of them passes through Python
+        local_cursor.execute("ATTACH DATABASE ? AS server", (server_db,))
         
-        for user in users:
-            local_cursor.execute('''
-                INSERT OR REPLACE INTO User (id, email, password, name, role, createdAt, updatedAt)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', user)
+        mappings = {table: shared_mapping(local_cursor, table, server_schema="server") for table in SYNC_TABLES}
         
-        print(f"✅ Users merged: {len(users)} records")
+        # Merge Users table (rows clashing on id or email are replaced, identical rows are left alone)
+        print("\n🔄 Merging Users table...")
+        users = merge_table_attached(local_cursor, mappings["User"])
+        print(f"✅ Users merged: {format_counts(users)}")
         
         # Merge Applications table
         print("🔄 Merging Applications table...")
-        server_cursor.execute("SELECT * FROM Application")
-        applications = server_cursor.fetchall()
-        
-        for app in applications:
-            local_cursor.execute('''
-                INSERT OR REPLACE INTO Application (
-                    id, updatedAt, countryOfResidence, phone, address, workplace, position,
-                    educationLevel, otherEducation, professionalContext, otherContext,
-                    expectedContribution, otherContribution, projectType, projectArea,
-                    otherProjectArea, projectSummary, projectMotivation, cvFileUrl,
-                    status, email, firstName, gender, lastName, middleName,
-                    nationality, title, createdAt, rejectionReason, submittedAt
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', app)
-        
-        print(f"✅ Applications merged: {len(applications)} records")
+        applications = merge_table_attached(local_cursor, mappings["Application"])
+        print(f"✅ Applications merged: {format_counts(applications)}")
         
         # Merge AdditionalDocuments table
         print("🔄 Merging AdditionalDocuments table...")
-        server_cursor.execute("SELECT * FROM AdditionalDocuments")
-        documents = server_cursor.fetchall()
-        
-        for doc in documents:
-            local_cursor.execute('''
-                INSERT OR REPLACE INTO AdditionalDocuments (
-                    id, applicationId, submissionStatus, createdAt, updatedAt,
-                    achievements, degreeCertifications, fullProjectProposal,
-                    fundingPlan, identityDocument, languageProficiency,
-                    referenceOne, referenceTwo, riskMitigation, submittedAt
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', doc)
-        
-        print(f"✅ Additional documents merged: {len(documents)} records")
+        documents = merge_table_attached(local_cursor, mappings["AdditionalDocuments"])
+        print(f"✅ Additional documents merged: {format_counts(documents)}")
         
         # Get final counts
         local_cursor.execute("SELECT COUNT(*) FROM User")
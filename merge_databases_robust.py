@@ -1,16 +1,161 @@
 #!/usr/bin/env python3
 
+import argparse
+import json
 import sqlite3
 import os
 from datetime import datetime
 
-def merge_databases():
+from sync_schema import SYNC_TABLES, shared_mapping
+
+DEFAULT_BATCH_SIZE = 1000
+
+# "attach" copies rows inside SQLite with INSERT ... SELECT; "loop" moves them through Python
+MERGE_ENGINES = ("attach", "loop")
+
+# Per-table high-water mark on updatedAt, kept in dev.db for incremental merges
+WATERMARK_TABLE = "_merge_watermarks"
+
+def ensure_watermark_table(cursor):
+    """Create the watermark state table if this database has never run an incremental merge"""
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+            tableName TEXT PRIMARY KEY,
+            updatedAt TEXT NOT NULL,
+            seenIds TEXT NOT NULL,
+            mergedAt TEXT NOT NULL
+        )
+    ''')
+
+def load_watermark(cursor, table):
+    """Return (updatedAt, ids merged at exactly that updatedAt) for a table, or None"""
+    cursor.execute(f"SELECT updatedAt, seenIds FROM {WATERMARK_TABLE} WHERE tableName = ?", (table,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return row[0], json.loads(row[1])
+
+def save_watermark(cursor, table, watermark):
+    cursor.execute(f'''
+        INSERT OR REPLACE INTO {WATERMARK_TABLE} (tableName, updatedAt, seenIds, mergedAt)
+        VALUES (?, ?, ?, ?)
+    ''', (table, watermark[0], json.dumps(watermark[1]), datetime.now().isoformat()))
+
+def server_watermark(server_cursor, table):
+    """Compute the watermark a merge of the whole server table reaches, or None if it is empty"""
+    server_cursor.execute(f"SELECT MAX(updatedAt) FROM {table}")
+    latest = server_cursor.fetchone()[0]
+    if latest is None:
+        return None
+    server_cursor.execute(f"SELECT id FROM {table} WHERE updatedAt = ? ORDER BY id", (latest,))
+    return latest, [row[0] for row in server_cursor.fetchall()]
+
+def changed_since(watermark, alias=None):
+    """SQL condition and parameters selecting rows updated after a watermark"""
+    if watermark is None:
+        return "true", ()
+    prefix = f"{alias}." if alias else ""
+    # Rows sharing the watermark timestamp are only new if their id was not merged last time
+    condition = (
+        f'({prefix}"updatedAt" > ? OR ({prefix}"updatedAt" = ? '
+        f'AND {prefix}id NOT IN (SELECT value FROM json_each(?))))'
+    )
+    updated_at, seen_ids = watermark
+    return condition, (updated_at, updated_at, json.dumps(seen_ids))
+
+def format_counts(counts):
+    """Render a merge result as 'N records (new, updated, unchanged)'"""
+    total = counts["inserted"] + counts["updated"] + counts["unchanged"]
+    return (f"{total} records ({counts['inserted']} new, {counts['updated']} updated, "
+            f"{counts['unchanged']} unchanged)")
+
+def copy_in_batches(server_cursor, local_cursor, mapping, batch_size=DEFAULT_BATCH_SIZE,
+                    where="true", params=(), skip_unchanged=True):
+    """Stream rows from the server cursor into the local one, batch_size rows at a time
+
+    Each batch is compared with the local rows of the same ids, so rows
+    that are already identical can be left alone instead of being
+    deleted and reinserted by INSERT OR REPLACE. With skip_unchanged off
+    every existing row is rewritten and counted as updated.
+    """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    server_cursor.execute(f"{mapping.select_sql} WHERE {where}", params)
+    while True:
+        rows = server_cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        local_cursor.execute(mapping.lookup_sql, (json.dumps([row[0] for row in rows]),))
+        current = {row[0]: row for row in local_cursor.fetchall()}
+        
+        changed_rows = []
+        for row in rows:
+            existing = current.get(row[0])
+            if existing is None:
+                counts["inserted"] += 1
+            elif skip_unchanged and existing == row:
+                counts["unchanged"] += 1
+                continue
+            else:
+                counts["updated"] += 1
+            changed_rows.append(row)
+        if changed_rows:
+            local_cursor.executemany(mapping.replace_sql, changed_rows)
+    return counts
+
+def merge_table_attached(local_cursor, mapping, schema="server", since=None, skip_unchanged=True):
+    """Upsert the rows of an ATTACHed table into main with a single INSERT ... SELECT"""
+    table = mapping.table
+    
+    # Mirror INSERT OR REPLACE: a local row holding the same unique value under another id is dropped
+    changed, params = changed_since(since, "s")
+    for key in mapping.unique:
+        local_cursor.execute(f'''
+            DELETE FROM main."{table}"
+            WHERE EXISTS (
+                SELECT 1 FROM {schema}."{table}" s
+                WHERE s."{key}" = main."{table}"."{key}" AND s.id <> main."{table}".id AND {changed}
+            )
+        ''', params)
+    
+    local_cursor.execute(f'''
+        SELECT COUNT(*), COUNT(m.id) FROM {schema}."{table}" s
+        LEFT JOIN main."{table}" m ON m.id = s.id
+        WHERE {changed}
+    ''', params)
+    candidates, existing = local_cursor.fetchone()
+    
+    # Only rewrite conflicting rows whose content differs, leaving their pages and indexes untouched
+    updates = mapping.update_set
+    if skip_unchanged:
+        updates += f" WHERE {mapping.differs}"
+    
+    # The WHERE clause also keeps the parser from reading ON CONFLICT as a join constraint
+    local_cursor.execute(f'''
+        INSERT INTO main."{table}" ({mapping.column_list})
+        SELECT {mapping.column_list} FROM {schema}."{table}" s WHERE {changed}
+        ON CONFLICT(id) DO UPDATE SET {updates}
+    ''', params)
+    written = local_cursor.rowcount
+    inserted = candidates - existing
+    return {"inserted": inserted, "updated": written - inserted, "unchanged": candidates - written}
+
+def merge_table(local_cursor, server_cursor, mapping, engine="attach", batch_size=DEFAULT_BATCH_SIZE,
+                since=None, skip_unchanged=True):
+    """Copy one table from the server snapshot with the chosen merge engine
+
+    With a watermark in `since`, only rows updated after it are copied.
+    Returns inserted/updated/unchanged counts.
+    """
+    if engine == "attach":
+        return merge_table_attached(local_cursor, mapping, since=since, skip_unchanged=skip_unchanged)
+    
+    changed, params = changed_since(since)
+    return copy_in_batches(server_cursor, local_cursor, mapping, batch_size, changed, params, skip_unchanged)
+
+def merge_databases(local_db="dev.db", server_db="server_db_backup.db", batch_size=DEFAULT_BATCH_SIZE, engine="attach", incremental=False, skip_unchanged=True):
     print("🚀 Starting robust database merge...")
     print("=" * 40)
     
-    local_db = "dev.db"
-    server_db = "server_db_backup.db"
-    
     # Connect to both databases
     local_conn = sqlite3.connect(local_db)
     server_conn = sqlite3.connect(server_db)
@@ -38,68 +183,45 @@ def merge_databases():
         print(f"   Local - Users: {local_users_before}, Apps: {local_apps_before}, Docs: {local_docs_before}")
         print(f"   Server - Users: {server_users}, Apps: {server_apps}, Docs: {server_docs}")
         
-        # Merge Users table
-        print("\n🔄 Merging Users table...")
-        server_cursor.execute("SELECT id, email, password, name, role, createdAt, updatedAt FROM User")
-        users = server_cursor.fetchall()
+        # Columns present on both sides, read from the databases themselves
+        mappings = {table: shared_mapping(local_cursor, table, server_cursor) for table in SYNC_TABLES}
+        
+        if engine == "attach":
+            local_cursor.execute("ATTACH DATABASE ? AS server", (server_db,))
         
-        for user in users:
-            local_cursor.execute('''
-                INSERT OR REPLACE INTO User (id, email, password, name, role, createdAt, updatedAt)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', user)
+        # Incremental runs only read rows updated since the last merge's watermark
+        watermarks = {}
+        if incremental:
+            ensure_watermark_table(local_cursor)
+            for table in SYNC_TABLES:
+                watermarks[table] = load_watermark(local_cursor, table)
+                if watermarks[table] is not None:
+                    print(f"⏱️  {table}: merging rows updated since {watermarks[table][0]}")
         
-        print(f"✅ Users merged: {len(users)} records")
+        # Merge Users table
+        print("\n🔄 Merging Users table...")
+        users = merge_table(local_cursor, server_cursor, mappings["User"], engine, batch_size,
+                            since=watermarks.get("User"), skip_unchanged=skip_unchanged)
+        print(f"✅ Users merged: {format_counts(users)}")
         
         # Merge Applications table using column names
         print("🔄 Merging Applications table...")
-        server_cursor.execute("""
-            SELECT id, updatedAt, countryOfResidence, phone, address, workplace, position,
-                   educationLevel, otherEducation, professionalContext, otherContext,
-                   expectedContribution, otherContribution, projectType, projectArea,
-                   otherProjectArea, projectSummary, projectMotivation, cvFileUrl,
-                   status, email, firstName, gender, lastName, middleName,
-                   nationality, title, createdAt, rejectionReason, submittedAt
-            FROM Application
-        """)
-        applications = server_cursor.fetchall()
-        
-        for app in applications:
-            local_cursor.execute('''
-                INSERT OR REPLACE INTO Application (
-                    id, updatedAt, countryOfResidence, phone, address, workplace, position,
-                    educationLevel, otherEducation, professionalContext, otherContext,
-                    expectedContribution, otherContribution, projectType, projectArea,
-                    otherProjectArea, projectSummary, projectMotivation, cvFileUrl,
-                    status, email, firstName, gender, lastName, middleName,
-                    nationality, title, createdAt, rejectionReason, submittedAt
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', app)
-        
-        print(f"✅ Applications merged: {len(applications)} records")
+        applications = merge_table(local_cursor, server_cursor, mappings["Application"], engine, batch_size,
+                                   since=watermarks.get("Application"), skip_unchanged=skip_unchanged)
+        print(f"✅ Applications merged: {format_counts(applications)}")
         
         # Merge AdditionalDocuments table
         print("🔄 Merging AdditionalDocuments table...")
-        server_cursor.execute("""
-            SELECT id, applicationId, submissionStatus, createdAt, updatedAt,
-                   achievements, degreeCertifications, fullProjectProposal,
-                   fundingPlan, identityDocument, languageProficiency,
-                   referenceOne, referenceTwo, riskMitigation, submittedAt
-            FROM AdditionalDocuments
-        """)
-        documents = server_cursor.fetchall()
-        
-        for doc in documents:
-            local_cursor.execute('''
-                INSERT OR REPLACE INTO AdditionalDocuments (
-                    id, applicationId, submissionStatus, createdAt, updatedAt,
-                    achievements, degreeCertifications, fullProjectProposal,
-                    fundingPlan, identityDocument, languageProficiency,
-                    referenceOne, referenceTwo, riskMitigation, submittedAt
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', doc)
+        documents = merge_table(local_cursor, server_cursor, mappings["AdditionalDocuments"], engine, batch_size,
+                                since=watermarks.get("AdditionalDocuments"), skip_unchanged=skip_unchanged)
+        print(f"✅ Additional documents merged: {format_counts(documents)}")
         
-        print(f"✅ Additional documents merged: {len(documents)} records")
+        # Advance the watermarks in the same transaction as the rows they cover
+        if incremental:
+            for table in watermarks:
+                watermark = server_watermark(server_cursor, table)
+                if watermark is not None:
+                    save_watermark(local_cursor, table, watermark)
         
         # Get final counts
         local_cursor.execute("SELECT COUNT(*) FROM User")
@@ -166,4 +288,17 @@ def merge_databases():
         server_conn.close()
 
 if __name__ == "__main__":
-    merge_databases()
+    parser = argparse.ArgumentParser(description="Merge server_db_backup.db into dev.db")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"rows read and written per batch by the loop engine (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--engine", choices=MERGE_ENGINES, default="attach",
+                        help="copy rows inside SQLite (attach) or through Python (loop)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only merge rows updated since the previous incremental merge")
+    parser.add_argument("--rewrite-unchanged", action="store_true",
+                        help="rewrite rows even when their content already matches the server")
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    merge_databases(batch_size=args.batch_size, engine=args.engine, incremental=args.incremental,
+                    skip_unchanged=not args.rewrite_unchanged)
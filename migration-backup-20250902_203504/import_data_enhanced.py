@@ -1,11 +1,19 @@
+import argparse
 import sqlite3
 import csv
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 import json
+import multiprocessing
 
-def parse_datetime(dt_str):
+# sync_schema.py lives in the project root, one level above this backup directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sync_schema import csv_mapping
+
+def parse_datetime_strptime(dt_str):
     """Parse datetime string from PostgreSQL format"""
     if not dt_str or dt_str == 'NULL' or dt_str.strip() == '':
         return None
@@ -18,6 +26,58 @@ def parse_datetime(dt_str):
             print(f"Warning: Could not parse datetime: {dt_str}")
             return None
 
+def parse_datetime(dt_str):
+    """Parse datetime string from PostgreSQL format
+
+    The exports write every timestamp with to_char(..., 'YYYY-MM-DD HH24:MI:SS'),
+    so that exact shape is sliced apart directly. Anything else, including
+    out-of-range values, goes through parse_datetime_strptime, which gives
+    the same results (and warnings) as before.
+    """
+    if not dt_str or dt_str == 'NULL':
+        return None
+    if (len(dt_str) == 19 and dt_str[4] == '-' and dt_str[7] == '-' and dt_str[10] == ' '
+            and dt_str[13] == ':' and dt_str[16] == ':'
+            and (dt_str[0:4] + dt_str[5:7] + dt_str[8:10] + dt_str[11:13] + dt_str[14:16] + dt_str[17:19]).isdecimal()):
+        try:
+            return datetime(int(dt_str[0:4]), int(dt_str[5:7]), int(dt_str[8:10]),
+                            int(dt_str[11:13]), int(dt_str[14:16]), int(dt_str[17:19]))
+        except ValueError:
+            pass
+    return parse_datetime_strptime(dt_str)
+
+parse_datetime_uncached = parse_datetime
+
+def use_datetime_cache(maxsize):
+    """Memoize parse_datetime in an LRU cache, for exports where timestamps repeat a lot
+
+    A maxsize of 0 switches the cache off again. Unparseable values only
+    warn the first time they are seen while cached.
+    """
+    global parse_datetime
+    if maxsize:
+        parse_datetime = lru_cache(maxsize=maxsize)(parse_datetime_uncached)
+    else:
+        parse_datetime = parse_datetime_uncached
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Converted batches a parse worker may have waiting for the writer
+DEFAULT_QUEUE_SIZE = 8
+
+def new_counts():
+    return {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+
+def stored_value(value):
+    """Return a value the way sqlite3 stores it, so it compares equal to what is read back"""
+    if isinstance(value, datetime):
+        return value.isoformat(" ")
+    return value
+
+def format_counts(counts):
+    return (f"{counts['inserted']} new, {counts['updated']} updated, "
+            f"{counts['unchanged']} unchanged, skipped: {counts['skipped']}")
+
 def get_table_counts(cursor):
     """Get current table counts"""
     cursor.execute("SELECT COUNT(*) FROM User")
@@ -28,138 +88,167 @@ def get_table_counts(cursor):
     documents = cursor.fetchone()[0]
     return users, applications, documents
 
-def import_users(cursor, csv_file):
+# Pipeline stages: read_rows -> convert_rows -> chunked -> write_batches.
+# Each stage is a generator, so only one chunk of rows is in memory at a time.
+
+def read_rows(csv_file):
+    """Reader stage: yield the export's header, then each row, as lists"""
+    with open(csv_file, 'r', encoding='utf-8', newline='') as f:
+        yield from csv.reader(f)
+
+def convert_rows(rows, convert, label, counts):
+    """Conversion stage: turn CSV rows into insert tuples, skipping rows that fail to convert"""
+    for row in rows:
+        try:
+            yield convert(row)
+        except Exception as e:
+            print(f"Warning: Could not import {label} {row[0] if row else 'unknown'}: {e}")
+            counts["skipped"] += 1
+
+def chunked(items, chunk_size):
+    """Group an iterable into lists of at most chunk_size items"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def write_batches(cursor, mapping, batches, label, counts):
+    """Writer stage: upsert each batch, leaving rows that are already identical untouched
+
+    Skipping identical rows avoids deleting and reinserting them, which
+    would rewrite their pages and every index on the table. If a batch
+    fails, its rows are retried one by one so only the bad rows are lost.
+    """
+    for batch in batches:
+        cursor.execute(mapping.lookup_sql, (json.dumps([values[0] for values in batch]),))
+        current = {row[0]: row for row in cursor.fetchall()}
+        
+        changed = []
+        for values in batch:
+            existing = current.get(values[0])
+            if existing is not None and existing == tuple(stored_value(value) for value in values):
+                counts["unchanged"] += 1
+            else:
+                changed.append((values, "inserted" if existing is None else "updated"))
+        
+        try:
+            cursor.executemany(mapping.replace_sql, [values for values, _ in changed])
+            for _, outcome in changed:
+                counts[outcome] += 1
+        except sqlite3.Error:
+            for values, outcome in changed:
+                try:
+                    cursor.execute(mapping.replace_sql, values)
+                    counts[outcome] += 1
+                except sqlite3.Error as e:
+                    print(f"Warning: Could not import {label} {values[0]}: {e}")
+                    counts["skipped"] += 1
+
+def import_table(cursor, csv_file, table, label, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Stream one export file through the reader, conversion and writer stages
+
+    The columns come from the export's header matched against the table,
+    so newer columns are picked up as soon as the export includes them.
+    """
+    counts = new_counts()
+    rows = read_rows(csv_file)
+    header = next(rows, None)
+    if header is None:
+        return counts
+    mapping = csv_mapping(cursor, table, header)
+    convert = mapping.csv_converter(header, parse_datetime)
+    batches = chunked(convert_rows(rows, convert, label, counts), chunk_size)
+    write_batches(cursor, mapping, batches, label, counts)
+    return counts
+
+def import_users(cursor, csv_file, chunk_size=DEFAULT_CHUNK_SIZE):
     """Import users from CSV file"""
     print(f"🔄 Importing users from {csv_file}...")
-    imported_count = 0
-    skipped_count = 0
-    
-    with open(csv_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO User (id, email, password, name, role, createdAt, updatedAt)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    row['id'],
-                    row['email'],
-                    row['password'],
-                    row['name'] if row['name'] != 'NULL' else None,
-                    row['role'],
-                    parse_datetime(row['created_at']),
-                    parse_datetime(row['updated_at'])
-                ))
-                imported_count += 1
-            except Exception as e:
-                print(f"Warning: Could not import user {row.get('email', 'unknown')}: {e}")
-                skipped_count += 1
-    
-    print(f"✅ Users imported: {imported_count}, skipped: {skipped_count}")
-    return imported_count, skipped_count
+    counts = import_table(cursor, csv_file, "User", "user", chunk_size)
+    print(f"✅ Users imported: {format_counts(counts)}")
+    return counts
 
-def import_applications(cursor, csv_file):
+def import_applications(cursor, csv_file, chunk_size=DEFAULT_CHUNK_SIZE):
     """Import applications from CSV file"""
     print(f"🔄 Importing applications from {csv_file}...")
-    imported_count = 0
-    skipped_count = 0
-    
-    with open(csv_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO Application (
-                        id, updatedAt, countryOfResidence, phone, address, workplace, position,
-                        educationLevel, otherEducation, professionalContext, otherContext,
-                        expectedContribution, otherContribution, projectType, projectArea,
-                        otherProjectArea, projectSummary, projectMotivation, cvFileUrl,
-                        status, email, firstName, gender, lastName, middleName,
-                        nationality, title, createdAt, rejectionReason, submittedAt
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    row['id'],
-                    parse_datetime(row['updated_at']),
-                    row['country_of_residence'],
-                    row['phone'],
-                    row['address'],
-                    row['workplace'],
-                    row['position'],
-                    row['education_level'],
-                    row['other_education'] if row['other_education'] != 'NULL' else None,
-                    row['professional_context'],
-                    row['other_context'] if row['other_context'] != 'NULL' else None,
-                    row['expected_contribution'],
-                    row['other_contribution'] if row['other_contribution'] != 'NULL' else None,
-                    row['project_type'],
-                    row['project_area'],
-                    row['other_project_area'] if row['other_project_area'] != 'NULL' else None,
-                    row['project_summary'],
-                    row['project_motivation'],
-                    row['cv_file_url'] if row['cv_file_url'] != 'NULL' else None,
-                    row['status'],
-                    row['email'],
-                    row['first_name'],
-                    row['gender'],
-                    row['last_name'],
-                    row['middle_name'] if row['middle_name'] != 'NULL' else None,
-                    row['nationality'],
-                    row['title'],
-                    parse_datetime(row['created_at']),
-                    row['rejection_reason'] if row['rejection_reason'] != 'NULL' else None,
-                    parse_datetime(row['submitted_at'])
-                ))
-                imported_count += 1
-            except Exception as e:
-                print(f"Warning: Could not import application {row.get('email', 'unknown')}: {e}")
-                skipped_count += 1
-    
-    print(f"✅ Applications imported: {imported_count}, skipped: {skipped_count}")
-    return imported_count, skipped_count
+    counts = import_table(cursor, csv_file, "Application", "application", chunk_size)
+    print(f"✅ Applications imported: {format_counts(counts)}")
+    return counts
 
-def import_additional_documents(cursor, csv_file):
+def import_additional_documents(cursor, csv_file, chunk_size=DEFAULT_CHUNK_SIZE):
     """Import additional documents from CSV file"""
     print(f"🔄 Importing additional documents from {csv_file}...")
-    imported_count = 0
-    skipped_count = 0
-    
-    with open(csv_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO AdditionalDocuments (
-                        id, applicationId, submissionStatus, createdAt, updatedAt,
-                        achievements, degreeCertifications, fullProjectProposal,
-                        fundingPlan, identityDocument, languageProficiency,
-                        referenceOne, referenceTwo, riskMitigation, submittedAt
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    row['id'],
-                    row['application_id'],
-                    row['submission_status'],
-                    parse_datetime(row['created_at']),
-                    parse_datetime(row['updated_at']),
-                    row['achievements'] if row['achievements'] != 'NULL' else None,
-                    row['degree_certifications'] if row['degree_certifications'] != 'NULL' else None,
-                    row['full_project_proposal'] if row['full_project_proposal'] != 'NULL' else None,
-                    row['funding_plan'] if row['funding_plan'] != 'NULL' else None,
-                    row['identity_document'] if row['identity_document'] != 'NULL' else None,
-                    row['language_proficiency'] if row['language_proficiency'] != 'NULL' else None,
-                    row['reference_one'] if row['reference_one'] != 'NULL' else None,
-                    row['reference_two'] if row['reference_two'] != 'NULL' else None,
-                    row['risk_mitigation'] if row['risk_mitigation'] != 'NULL' else None,
-                    parse_datetime(row['submitted_at'])
-                ))
-                imported_count += 1
-            except Exception as e:
-                print(f"Warning: Could not import document {row.get('id', 'unknown')}: {e}")
-                skipped_count += 1
-    
-    print(f"✅ Additional documents imported: {imported_count}, skipped: {skipped_count}")
-    return imported_count, skipped_count
+    counts = import_table(cursor, csv_file, "AdditionalDocuments", "document", chunk_size)
+    print(f"✅ Additional documents imported: {format_counts(counts)}")
+    return counts
+
+def read_header(csv_file):
+    with open(csv_file, 'r', encoding='utf-8', newline='') as f:
+        return next(csv.reader(f), None)
+
+def convert_export(csv_file, mapping, label, chunk_size, queue):
+    """Pool worker: parse and convert one export file, handing batches to the writer through queue"""
+    try:
+        counts = new_counts()
+        rows = read_rows(csv_file)
+        header = next(rows, None)
+        if header is not None:
+            convert = mapping.csv_converter(header, parse_datetime)
+            for batch in chunked(convert_rows(rows, convert, label, counts), chunk_size):
+                queue.put(("batch", batch))
+        queue.put(("done", counts["skipped"]))
+    except Exception as e:
+        queue.put(("error", f"{type(e).__name__}: {e}"))
+
+def queued_batches(queue, counts):
+    """Yield the batches a worker puts on queue until it reports that it is done"""
+    while True:
+        kind, payload = queue.get()
+        if kind == "batch":
+            yield payload
+        elif kind == "done":
+            counts["skipped"] += payload
+            return
+        else:
+            raise RuntimeError(f"Converting export failed: {payload}")
 
-def main():
+def import_parallel(conn, cursor, exports, chunk_size=DEFAULT_CHUNK_SIZE, workers=2, queue_size=DEFAULT_QUEUE_SIZE):
+    """Convert export files in a process pool while this process alone writes them
+
+    exports is a list of (table, label, csv_file) in parent-first order.
+    SQLite has a single writer anyway, so parsing and conversion run in
+    the pool and this connection drains one bounded queue per file, in
+    order. Parent tables are committed before AdditionalDocuments is
+    written. Returns {table: counts}.
+    """
+    results = {}
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = []
+        for table, label, csv_file in exports:
+            header = read_header(csv_file)
+            if header is None:
+                results[table] = new_counts()
+                continue
+            mapping = csv_mapping(cursor, table, header)
+            queue = manager.Queue(maxsize=queue_size)
+            future = pool.submit(convert_export, csv_file, mapping, label, chunk_size, queue)
+            jobs.append((table, label, csv_file, mapping, queue, future))
+        
+        for table, label, csv_file, mapping, queue, future in jobs:
+            if table == "AdditionalDocuments":
+                conn.commit()
+            print(f"🔄 Importing {label}s from {csv_file} ({workers} workers)...")
+            counts = new_counts()
+            write_batches(cursor, mapping, queued_batches(queue, counts), label, counts)
+            future.result()
+            results[table] = counts
+    return results
+
+def main(chunk_size=DEFAULT_CHUNK_SIZE, workers=0):
     print("🚀 Starting Enhanced Data Import...")
     print("====================================")
     
@@ -196,29 +285,47 @@ def main():
         
         export_dir = export_dirs[0]  # Use the first (and should be only) export directory
         
-        # Import users
         users_file = os.path.join(export_dir, 'users_export.csv')
-        if os.path.exists(users_file):
-            users_imported, users_skipped = import_users(cursor, users_file)
-        else:
-            print("⚠️  Users export file not found")
-            users_imported, users_skipped = 0, 0
-        
-        # Import applications
         applications_file = os.path.join(export_dir, 'applications_export.csv')
-        if os.path.exists(applications_file):
-            apps_imported, apps_skipped = import_applications(cursor, applications_file)
-        else:
-            print("⚠️  Applications export file not found")
-            apps_imported, apps_skipped = 0, 0
-        
-        # Import additional documents
         additional_docs_file = os.path.join(export_dir, 'additional_documents_export.csv')
-        if os.path.exists(additional_docs_file):
-            docs_imported, docs_skipped = import_additional_documents(cursor, additional_docs_file)
+        
+        if workers:
+            exports = []
+            for table, label, csv_file in (("User", "user", users_file),
+                                           ("Application", "application", applications_file),
+                                           ("AdditionalDocuments", "additional document", additional_docs_file)):
+                if os.path.exists(csv_file):
+                    exports.append((table, label, csv_file))
+                else:
+                    print(f"⚠️  {table} export file not found")
+            results = import_parallel(conn, cursor, exports, chunk_size, workers)
+            users = results.get("User", new_counts())
+            apps = results.get("Application", new_counts())
+            docs = results.get("AdditionalDocuments", new_counts())
+            print(f"✅ Users imported: {format_counts(users)}")
+            print(f"✅ Applications imported: {format_counts(apps)}")
+            print(f"✅ Additional documents imported: {format_counts(docs)}")
         else:
-            print("⚠️  Additional documents export file not found")
-            docs_imported, docs_skipped = 0, 0
+            # Import users
+            if os.path.exists(users_file):
+                users = import_users(cursor, users_file, chunk_size)
+            else:
+                print("⚠️  Users export file not found")
+                users = new_counts()
+        
+            # Import applications
+            if os.path.exists(applications_file):
+                apps = import_applications(cursor, applications_file, chunk_size)
+            else:
+                print("⚠️  Applications export file not found")
+                apps = new_counts()
+        
+            # Import additional documents
+            if os.path.exists(additional_docs_file):
+                docs = import_additional_documents(cursor, additional_docs_file, chunk_size)
+            else:
+                print("⚠️  Additional documents export file not found")
+                docs = new_counts()
         
         # Get final record counts
         users_after, applications_after, docs_after = get_table_counts(cursor)
@@ -237,14 +344,29 @@ def main():
                 "additional_documents": docs_before
             },
             "imported": {
-                "users": users_imported,
-                "applications": apps_imported,
-                "additional_documents": docs_imported
+                "users": users["inserted"] + users["updated"],
+                "applications": apps["inserted"] + apps["updated"],
+                "additional_documents": docs["inserted"] + docs["updated"]
             },
             "skipped": {
-                "users": users_skipped,
-                "applications": apps_skipped,
-                "additional_documents": docs_skipped
+                "users": users["skipped"],
+                "applications": apps["skipped"],
+                "additional_documents": docs["skipped"]
+            },
+            "inserted": {
+                "users": users["inserted"],
+                "applications": apps["inserted"],
+                "additional_documents": docs["inserted"]
+            },
+            "updated": {
+                "users": users["updated"],
+                "applications": apps["updated"],
+                "additional_documents": docs["updated"]
+            },
+            "unchanged": {
+                "users": users["unchanged"],
+                "applications": apps["unchanged"],
+                "additional_documents": docs["unchanged"]
             },
             "after": {
                 "users": users_after,
@@ -301,4 +423,15 @@ def main():
         conn.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Import the server's CSV exports into ../dev.db")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"rows converted and written per batch (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--timestamp-cache", type=int, default=0,
+                        help="cache this many parsed timestamps (default: 0, no cache)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="parse and convert the exports in this many processes (default: 0, in-process)")
+    args = parser.parse_args()
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    use_datetime_cache(args.timestamp_cache)
+    main(chunk_size=args.chunk_size, workers=args.workers)
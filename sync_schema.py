@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Column mappings shared by the merge and import scripts.
+
+Column lists, placeholders and per-column conversions used to be typed
+out by hand in every script, and drifted apart. Here they are read once
+from the database (PRAGMA table_info), or from prisma/schema.prisma when
+the table does not exist yet, and turned into a TableMapping holding
+the SQL statements and a precompiled CSV row converter.
+"""
+
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+PRISMA_SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prisma", "schema.prisma")
+
+# Tables the sync tooling moves, parents before children
+SYNC_TABLES = ("User", "Application", "AdditionalDocuments")
+
+# type is the Prisma scalar type: String, DateTime, Boolean, Int, Float
+Column = namedtuple("Column", "name type nullable")
+
+PRISMA_SCALARS = ("String", "DateTime", "Boolean", "Int", "BigInt", "Float", "Decimal")
+
+SQLITE_TYPES = {
+    "DATETIME": "DateTime",
+    "BOOLEAN": "Boolean",
+    "INTEGER": "Int",
+    "BIGINT": "BigInt",
+    "REAL": "Float",
+    "DECIMAL": "Decimal",
+}
+
+BOOLEAN_VALUES = {"t": 1, "true": 1, "1": 1, "f": 0, "false": 0, "0": 0}
+
+def snake_case(name):
+    """countryOfResidence -> country_of_residence, the naming the server exports use"""
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+@lru_cache(maxsize=None)
+def load_prisma_schema(path=PRISMA_SCHEMA):
+    """Return {model: {"columns": (Column, ...), "unique": (...), "id": name}} from schema.prisma"""
+    models = {}
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    for model, body in re.findall(r"^model\s+(\w+)\s*\{(.*?)^\}", text, re.S | re.M):
+        columns, unique, primary = [], [], None
+        for line in body.splitlines():
+            line = line.split("//", 1)[0].strip()
+            match = re.match(r"(\w+)\s+(\w+)(\?|\[\])?(.*)", line)
+            if not match or line.startswith("@@"):
+                continue
+            name, type_, modifier, attributes = match.groups()
+            # Relation fields (another model, or a list of one) are not columns
+            if type_ not in PRISMA_SCALARS or modifier == "[]":
+                continue
+            columns.append(Column(name, type_, modifier == "?"))
+            if "@id" in attributes:
+                primary = name
+            elif "@unique" in attributes:
+                unique.append(name)
+        models[model] = {"columns": tuple(columns), "unique": tuple(unique), "id": primary}
+    return models
+
+def table_columns(cursor, table, schema="main"):
+    """Read a table's columns with PRAGMA table_info, falling back to schema.prisma"""
+    cursor.execute(f'PRAGMA {schema}.table_info("{table}")')
+    rows = cursor.fetchall()
+    if not rows:
+        return load_prisma_schema()[table]["columns"]
+    return tuple(
+        Column(name, SQLITE_TYPES.get(declared.upper(), "String"), not notnull and not pk)
+        for _, name, declared, notnull, _, pk in rows
+    )
+
+def unique_keys(cursor, table, schema="main"):
+    """Single-column unique keys other than the primary key"""
+    cursor.execute(f'PRAGMA {schema}.table_info("{table}")')
+    if not cursor.fetchall():
+        return load_prisma_schema()[table]["unique"]
+    cursor.execute(f'PRAGMA {schema}.index_list("{table}")')
+    indexes = [name for _, name, unique, origin, _ in cursor.fetchall() if unique and origin != "pk"]
+    keys = []
+    for name in indexes:
+        cursor.execute(f'PRAGMA {schema}.index_info("{name}")')
+        info = cursor.fetchall()
+        if len(info) == 1:
+            keys.append(info[0][2])
+    return tuple(keys)
+
+def none_if_null(value):
+    return None if value == "NULL" else value
+
+def parse_boolean(value):
+    return BOOLEAN_VALUES.get(value.strip().lower()) if value and value != "NULL" else None
+
+def parse_number(cast):
+    def parse(value):
+        return cast(value) if value and value != "NULL" else None
+    return parse
+
+class TableMapping:
+    """Columns of one table plus the SQL every merge and import path needs for it
+
+    Statements are built once, when the mapping is created, and reused
+    for every batch.
+    """
+
+    def __init__(self, table, columns, unique=()):
+        self.table = table
+        self.fields = tuple(columns)
+        self.columns = tuple(column.name for column in columns)
+        self.unique = tuple(key for key in unique if key in self.columns)
+
+        quoted = ", ".join(f'"{name}"' for name in self.columns)
+        placeholders = ", ".join("?" * len(self.columns))
+        self.column_list = quoted
+        self.select_sql = f'SELECT {quoted} FROM "{table}"'
+        self.replace_sql = f'INSERT OR REPLACE INTO "{table}" ({quoted}) VALUES ({placeholders})'
+        self.lookup_sql = f'SELECT {quoted} FROM "{table}" WHERE id IN (SELECT value FROM json_each(?))'
+        self.update_set = ", ".join(f'"{name}" = excluded."{name}"' for name in self.columns if name != "id")
+        self.differs = " OR ".join(
+            f'"{table}"."{name}" IS NOT excluded."{name}"' for name in self.columns if name != "id"
+        )
+
+    def csv_converter(self, header, parse_datetime):
+        """Build a function turning one CSV row (a list, in header order) into an insert tuple
+
+        Column positions and per-column conversions are resolved here, so
+        converting a row is a single pass over a tuple of callables.
+        """
+        positions = {name: index for index, name in enumerate(header)}
+        steps = []
+        for column in self.fields:
+            if column.type == "DateTime":
+                convert = parse_datetime
+            elif column.type == "Boolean":
+                convert = parse_boolean
+            elif column.type in ("Int", "BigInt"):
+                convert = parse_number(int)
+            elif column.type in ("Float", "Decimal"):
+                convert = parse_number(float)
+            elif column.nullable:
+                convert = none_if_null
+            else:
+                convert = None
+            steps.append((positions[snake_case(column.name)], convert))
+        steps = tuple(steps)
+
+        def convert_row(row):
+            return tuple([row[index] if convert is None else convert(row[index]) for index, convert in steps])
+        return convert_row
+
+def local_mapping(cursor, table):
+    """Mapping over every column of a table in the main database"""
+    return TableMapping(table, table_columns(cursor, table), unique_keys(cursor, table))
+
+def shared_mapping(local_cursor, table, server_cursor=None, server_schema=None):
+    """Mapping over the columns a table has both locally and on the server snapshot
+
+    Pass server_cursor for a separate connection, or server_schema for a
+    database ATTACHed to the local one.
+    """
+    if server_schema is not None:
+        server_cursor, schema = local_cursor, server_schema
+    else:
+        schema = "main"
+    server_names = {column.name for column in table_columns(server_cursor, table, schema)}
+    columns = [column for column in table_columns(local_cursor, table) if column.name in server_names]
+    return TableMapping(table, columns, unique_keys(local_cursor, table))
+
+def csv_mapping(cursor, table, header):
+    """Mapping over the columns of a table that an export file provides, in table order"""
+    available = set(header)
+    columns = [column for column in table_columns(cursor, table) if snake_case(column.name) in available]
+    return TableMapping(table, columns, unique_keys(cursor, table))
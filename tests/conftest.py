@@ -0,0 +1,154 @@
+"""Fixtures shared by the sync tooling's tests.
+
+A local and a server database that share half their rows, with a tenth
+of the shared rows changed on the server, and the server's CSV exports.
+"""
+
+import csv
+import glob
+import importlib.util
+import os
+import shutil
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmark_sync import SCHEMA_SQL
+
+SYNC_TABLES = ("User", "Application", "AdditionalDocuments")
+
+APPLICATIONS = 60
+
+BASE_TIME = datetime(2025, 1, 1, 8, 0, 0)
+
+EXPORT_FILES = {
+    "User": "users_export.csv",
+    "Application": "applications_export.csv",
+    "AdditionalDocuments": "additional_documents_export.csv",
+}
+
+ID_PREFIXES = {"User": "user", "Application": "app", "AdditionalDocuments": "doc"}
+
+STATUSES = ("pending", "approved", "rejected", "under_review")
+
+def snake_case(name):
+    return "".join(f"_{char.lower()}" if char.isupper() else char for char in name)
+
+def is_changed(i):
+    return (i * 2654435761) % 10000 < 1000
+
+def value(table, column, declared, nullable, i, version):
+    """A deterministic value for one column of row i; version 1 is the server's changed copy"""
+    if column == "id":
+        return f"{ID_PREFIXES[table]}-{i:08d}"
+    if column == "applicationId":
+        return f"app-{i:08d}"
+    if column == "email":
+        return f"{ID_PREFIXES[table]}{i}@example.org"
+    if column == "updatedAt":
+        return str(BASE_TIME + timedelta(minutes=i, days=30 * version))
+    if column in ("status", "submissionStatus"):
+        return STATUSES[(i + version) % len(STATUSES)]
+    if column == "role":
+        return "admin" if i % 10 == 0 else "user"
+    if declared == "DATETIME":
+        return None if nullable and i % 2 else str(BASE_TIME + timedelta(minutes=i))
+    if declared == "BOOLEAN":
+        return int(i % 7 == 0)
+    if nullable and i % 3 == 0:
+        return None
+    return f"{column} {i % 97}"
+
+def build_database(path, apps, version_of):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA_SQL)
+    ranges = {
+        "User": range(apps.start // 100, apps.stop // 100 + 1),
+        "Application": apps,
+        "AdditionalDocuments": range(apps.start + (-apps.start) % 3, apps.stop, 3),
+    }
+    for table in SYNC_TABLES:
+        columns = [(row[1], row[2], not row[3] and not row[5])
+                   for row in conn.execute(f'PRAGMA table_info("{table}")')]
+        conn.executemany(
+            f'INSERT INTO "{table}" VALUES ({", ".join("?" * len(columns))})',
+            [tuple(value(table, name, declared, nullable, i, version_of(i)) for name, declared, nullable in columns)
+             for i in ranges[table]],
+        )
+    conn.commit()
+    conn.close()
+
+def export_csv(db, export_dir):
+    """Write a database's tables as the server's COPY ... CSV HEADER exports, booleans as t/f"""
+    os.makedirs(export_dir)
+    conn = sqlite3.connect(db)
+    for table in SYNC_TABLES:
+        booleans = {row[1] for row in conn.execute(f'PRAGMA table_info("{table}")') if row[2] == "BOOLEAN"}
+        cursor = conn.execute(f'SELECT * FROM "{table}"')
+        names = [column[0] for column in cursor.description]
+        with open(os.path.join(export_dir, EXPORT_FILES[table]), "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([snake_case(name) for name in names])
+            for row in cursor:
+                writer.writerow([("t" if field else "f") if name in booleans else "" if field is None else field
+                                 for name, field in zip(names, row)])
+    conn.close()
+
+@pytest.fixture(scope="session")
+def fixture_dir(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("fixture")
+    shared = APPLICATIONS // 2
+    build_database(workdir / "base_dev.db", range(0, APPLICATIONS), lambda i: 0)
+    build_database(workdir / "server_db_backup.db", range(APPLICATIONS - shared, 2 * APPLICATIONS - shared),
+                   lambda i: int(i < APPLICATIONS and is_changed(i)))
+    export_csv(workdir / "server_db_backup.db", workdir / "exports" / "fellowship_export_bench")
+    return workdir
+
+@pytest.fixture
+def local_db(fixture_dir, tmp_path):
+    """A fresh copy of the local database"""
+    path = tmp_path / "dev.db"
+    shutil.copy(fixture_dir / "base_dev.db", path)
+    return str(path)
+
+@pytest.fixture
+def server_db(fixture_dir, tmp_path):
+    """A fresh copy of the server snapshot"""
+    path = tmp_path / "server_db_backup.db"
+    shutil.copy(fixture_dir / "server_db_backup.db", path)
+    return str(path)
+
+@pytest.fixture
+def export_dir(fixture_dir):
+    return fixture_dir / "exports" / "fellowship_export_bench"
+
+@pytest.fixture
+def empty_db(tmp_path):
+    """A database with the tables and no rows"""
+    path = tmp_path / "empty.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA_SQL)
+    conn.close()
+    return str(path)
+
+@pytest.fixture(scope="session")
+def importer():
+    """migration-backup-*/import_data_enhanced.py, which is not in a package"""
+    path = sorted(glob.glob(os.path.join(ROOT, "migration-backup-*", "import_data_enhanced.py")))[-1]
+    spec = importlib.util.spec_from_file_location("import_data_enhanced", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def table_rows(path, table):
+    """Every row of a table, in id order"""
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f'SELECT * FROM "{table}" ORDER BY id').fetchall()
+    finally:
+        conn.close()
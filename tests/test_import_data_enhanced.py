@@ -0,0 +1,95 @@
+import csv
+import shutil
+import sqlite3
+
+import pytest
+
+from conftest import table_rows
+
+TIMESTAMPS = [
+    "2025-01-31 12:50:00",
+    "1999-12-31 23:59:59",
+    "2024-02-29 00:00:00",
+    "2025-02-30 10:00:00",
+    "2025-13-01 10:00:00",
+    "2025-01-31 24:00:00",
+    "2025-01-31 12:50:00.123456",
+    " 2025-01-31 12:50:00 ",
+    "2025-01-31T12:50:00",
+    "2025-1-31 12:50:00",
+    "+025-01-31 12:50:00",
+    "２０２５-01-31 12:50:00",
+    "not a date",
+    "",
+    "NULL",
+    None,
+]
+
+@pytest.mark.parametrize("value", TIMESTAMPS)
+def test_parse_datetime_matches_strptime(importer, value):
+    assert importer.parse_datetime(value) == importer.parse_datetime_strptime(value)
+
+def test_parse_datetime_cache(importer):
+    importer.use_datetime_cache(16)
+    try:
+        assert importer.parse_datetime("2025-01-31 12:50:00") == importer.parse_datetime_strptime("2025-01-31 12:50:00")
+        assert importer.parse_datetime.cache_info().currsize == 1
+    finally:
+        importer.use_datetime_cache(0)
+    assert importer.parse_datetime is importer.parse_datetime_uncached
+
+def import_applications(importer, db, csv_file, **options):
+    conn = sqlite3.connect(db)
+    try:
+        counts = importer.import_applications(conn.cursor(), str(csv_file), **options)
+        conn.commit()
+        return counts
+    finally:
+        conn.close()
+
+def test_import_then_reimport_leaves_rows_unchanged(importer, empty_db, server_db, export_dir):
+    csv_file = export_dir / "applications_export.csv"
+    first = import_applications(importer, empty_db, csv_file, chunk_size=7)
+    assert first == {"inserted": 60, "updated": 0, "unchanged": 0, "skipped": 0}
+    assert [row[:2] for row in table_rows(empty_db, "Application")] == \
+        [row[:2] for row in table_rows(server_db, "Application")]
+
+    again = import_applications(importer, empty_db, csv_file, chunk_size=7)
+    assert again == {"inserted": 0, "updated": 0, "unchanged": 60, "skipped": 0}
+
+def test_chunks_are_bounded(importer):
+    assert [len(chunk) for chunk in importer.chunked(iter(range(23)), 10)] == [10, 10, 3]
+
+def test_a_failing_row_only_costs_itself(importer, empty_db, export_dir, tmp_path):
+    with open(export_dir / "applications_export.csv", encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    # Parsed as NULL, which the NOT NULL updatedAt column rejects when the batch is written
+    rows[3][rows[0].index("updated_at")] = "not a date"
+    csv_file = tmp_path / "applications_export.csv"
+    with open(csv_file, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows(rows)
+    counts = import_applications(importer, empty_db, csv_file, chunk_size=7)
+    assert counts == {"inserted": 59, "updated": 0, "unchanged": 0, "skipped": 1}
+    assert rows[3][0] not in {row[0] for row in table_rows(empty_db, "Application")}
+
+def test_parallel_import_matches_the_serial_one(importer, empty_db, export_dir, tmp_path):
+    serial = str(tmp_path / "serial.db")
+    shutil.copy(empty_db, serial)
+    exports = [(table, label, str(export_dir / name)) for table, label, name in (
+        ("User", "user", "users_export.csv"),
+        ("Application", "application", "applications_export.csv"),
+        ("AdditionalDocuments", "additional document", "additional_documents_export.csv"),
+    )]
+    conn = sqlite3.connect(empty_db)
+    results = importer.import_parallel(conn, conn.cursor(), exports, chunk_size=7, workers=2, queue_size=2)
+    conn.commit()
+    conn.close()
+    assert results["Application"] == {"inserted": 60, "updated": 0, "unchanged": 0, "skipped": 0}
+
+    conn = sqlite3.connect(serial)
+    for table, label, csv_file in exports:
+        importer.import_table(conn.cursor(), csv_file, table, label, chunk_size=7)
+    conn.commit()
+    conn.close()
+    for table, _, _ in exports:
+        assert table_rows(empty_db, table) == table_rows(serial, table)
@@ -0,0 +1,94 @@
+import shutil
+import sqlite3
+
+import pytest
+
+from conftest import SYNC_TABLES, table_rows
+from merge_databases_robust import merge_databases, merge_table
+from sync_schema import shared_mapping
+
+def all_rows(db):
+    return {table: table_rows(db, table) for table in SYNC_TABLES}
+
+@pytest.fixture
+def second_local(local_db, tmp_path):
+    path = tmp_path / "second.db"
+    shutil.copy(local_db, path)
+    return str(path)
+
+def test_server_rows_win_and_local_rows_stay(local_db, server_db):
+    merge_databases(local_db, server_db, batch_size=7)
+    local_apps = {row[0]: row for row in table_rows(local_db, "Application")}
+    assert len(local_apps) == 90
+    for row in table_rows(server_db, "Application"):
+        assert local_apps[row[0]] == row
+    assert "app-00000000" in local_apps
+
+def test_batch_size_does_not_change_the_result(local_db, second_local, server_db):
+    merge_databases(local_db, server_db, batch_size=1)
+    merge_databases(second_local, server_db, batch_size=1000)
+    assert all_rows(local_db) == all_rows(second_local)
+
+@pytest.mark.parametrize("engine", ["attach", "loop"])
+def test_engines_agree(local_db, second_local, server_db, engine):
+    merge_databases(local_db, server_db, engine=engine)
+    merge_databases(second_local, server_db, engine="loop", batch_size=7)
+    assert all_rows(local_db) == all_rows(second_local)
+
+@pytest.mark.parametrize("engine", ["attach", "loop"])
+def test_local_row_with_a_server_email_gives_way(local_db, server_db, engine):
+    conn = sqlite3.connect(local_db)
+    conn.execute('UPDATE "Application" SET email = ? WHERE id = ?', ("app70@example.org", "app-00000001"))
+    conn.commit()
+    conn.close()
+    merge_databases(local_db, server_db, engine=engine)
+    assert "app-00000001" not in {row[0] for row in table_rows(local_db, "Application")}
+
+def execute(db, sql, params=()):
+    conn = sqlite3.connect(db)
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+def address(db, app_id):
+    conn = sqlite3.connect(db)
+    try:
+        return conn.execute('SELECT address FROM "Application" WHERE id = ?', (app_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+@pytest.mark.parametrize("engine", ["attach", "loop"])
+def test_incremental_merge_reads_only_rows_past_the_watermark(local_db, second_local, server_db, engine):
+    merge_databases(local_db, server_db, engine=engine, incremental=True)
+    merge_databases(second_local, server_db, engine=engine)
+    assert all_rows(local_db) == all_rows(second_local)
+
+    latest = max(row[1] for row in table_rows(server_db, "Application"))
+    execute(local_db, 'UPDATE "Application" SET address = ? WHERE id = ?', ("edited locally", "app-00000040"))
+    execute(server_db, 'UPDATE "Application" SET address = ?, "updatedAt" = ? WHERE id = ?',
+            ("edited on the server", "2030-01-01 00:00:00", "app-00000050"))
+    # A new row at exactly the old watermark's timestamp is still picked up
+    conn = sqlite3.connect(server_db)
+    conn.execute('CREATE TEMP TABLE tie AS SELECT * FROM "Application" WHERE id = ?', ("app-00000089",))
+    conn.execute('UPDATE tie SET id = ?, email = ?, "updatedAt" = ?', ("app-tie", "tie@example.org", latest))
+    conn.execute('INSERT INTO "Application" SELECT * FROM tie')
+    conn.commit()
+    conn.close()
+
+    merge_databases(local_db, server_db, engine=engine, incremental=True)
+    assert address(local_db, "app-00000040") == "edited locally"
+    assert address(local_db, "app-00000050") == "edited on the server"
+    assert "app-tie" in {row[0] for row in table_rows(local_db, "Application")}
+
+@pytest.mark.parametrize("engine", ["attach", "loop"])
+def test_merging_again_changes_nothing(local_db, server_db, engine):
+    merge_databases(local_db, server_db, engine=engine)
+    conn = sqlite3.connect(local_db)
+    conn.execute("ATTACH DATABASE ? AS server", (server_db,))
+    server = sqlite3.connect(server_db)
+    mapping = shared_mapping(conn.cursor(), "Application", server.cursor())
+    counts = merge_table(conn.cursor(), server.cursor(), mapping, engine=engine)
+    assert counts == {"inserted": 0, "updated": 0, "unchanged": 60}
+    assert conn.total_changes == 0
+    conn.close()
+    server.close()
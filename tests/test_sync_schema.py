@@ -0,0 +1,49 @@
+import sqlite3
+
+from conftest import SYNC_TABLES
+from sync_schema import Column, TableMapping, load_prisma_schema, local_mapping, shared_mapping, snake_case, table_columns
+
+def test_prisma_created_tables_read_back_as_the_schema(empty_db):
+    conn = sqlite3.connect(empty_db)
+    models = load_prisma_schema()
+    for table in SYNC_TABLES:
+        assert table_columns(conn.cursor(), table) == models[table]["columns"]
+    conn.close()
+
+def test_missing_tables_fall_back_to_the_prisma_schema():
+    conn = sqlite3.connect(":memory:")
+    assert table_columns(conn.cursor(), "Application") == load_prisma_schema()["Application"]["columns"]
+    conn.close()
+
+def test_snake_case():
+    assert snake_case("applicationId") == "application_id"
+    assert snake_case("cvFileUrl") == "cv_file_url"
+    assert snake_case("id") == "id"
+
+def test_csv_converter_follows_the_header_and_column_types():
+    mapping = TableMapping("Example", [
+        Column("id", "String", False),
+        Column("note", "String", True),
+        Column("title", "String", False),
+        Column("active", "Boolean", False),
+        Column("score", "Int", True),
+        Column("ratio", "Float", True),
+        Column("createdAt", "DateTime", False),
+    ])
+    header = ["created_at", "ratio", "score", "active", "title", "note", "id"]
+    convert = mapping.csv_converter(header, lambda value: f"parsed {value}")
+    assert convert(["2025-01-01", "0.5", "7", "t", "NULL", "NULL", "x-1"]) == \
+        ("x-1", None, "NULL", 1, 7, 0.5, "parsed 2025-01-01")
+    assert convert(["2025-01-01", "", "", "false", "", "", "x-2"]) == \
+        ("x-2", "", "", 0, None, None, "parsed 2025-01-01")
+
+def test_shared_mapping_leaves_out_columns_the_server_lacks(empty_db):
+    server = sqlite3.connect(":memory:")
+    server.execute('CREATE TABLE "User" (id TEXT PRIMARY KEY, email TEXT NOT NULL)')
+    local = sqlite3.connect(empty_db)
+    mapping = shared_mapping(local.cursor(), "User", server.cursor())
+    assert mapping.columns == ("id", "email")
+    assert mapping.unique == ("email",)
+    assert len(local_mapping(local.cursor(), "User").columns) > 2
+    local.close()
+    server.close()